@@ -3,7 +3,7 @@
 Update Product/Build Version in iOS backup bundle plists.
 
 Usage:
-  python update_backup_version.py /path/to/Backup.mobiletransfer [--version 17.0] [--build 21A123] [--backup]
+  python update_backup_version.py /path/to/Backup.mobiletransfer [--version 17.0] [--build 21A123] [--backup] [--no-verify]
 
 If --version/--build are omitted, the script will interactively prompt for them.
 
@@ -19,101 +19,551 @@ Interactive flow:
 - Asks for confirmation (Y/N) to overwrite, then prompts for new values if needed.
 """
 
-import argparse
+import base64
+import concurrent.futures
+import datetime
+import hashlib
+import io
+import mmap
 import os
 import plistlib
-import shutil
 import sys
-import tempfile
 
+# shutil and tempfile are imported lazily at their single call sites;
+# neither is needed on the common interactive startup path.
+
+# Optional: lxml (libxml2) parses/serializes XML plists noticeably faster than
+# plistlib's pure-Python path. Fall back to plistlib when unavailable.
+try:
+    from lxml import etree as _etree
+except ImportError:
+    _etree = None
+
+_PLIST_DOCTYPE = (
+    '<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" '
+    '"http://www.apple.com/DTDs/PropertyList-1.0.dtd">'
+)
+_PLIST_DATE_FMT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Canonical version keys: Info.plist uses spaced names at top level,
+# Manifest.plist uses unspaced names under the Lockdown dictionary.
+_INFO_KEYS = ("Product Version", "Build Version")
+_MANIFEST_KEYS = ("ProductVersion", "BuildVersion")
+
+
+def _date_from_text(text):
+    """Parse a plist date with plistlib's exact leniency: trailing fields may
+    be omitted ('2025-09-05Z', '2025-09-05T12Z'), and too-short forms raise
+    just as plistlib's do."""
+    import re
+
+    m = re.match(
+        r"(?P<year>\d\d\d\d)(?:-(?P<month>\d\d)(?:-(?P<day>\d\d)"
+        r"(?:T(?P<hour>\d\d)(?::(?P<minute>\d\d)(?::(?P<second>\d\d))?)?)?)?)?Z",
+        text, re.ASCII)
+    if m is None:
+        raise ValueError(f"Invalid date: {text!r}")
+    parts = []
+    for field in ("year", "month", "day", "hour", "minute", "second"):
+        value = m.group(field)
+        if value is None:
+            break
+        parts.append(int(value))
+    return datetime.datetime(*parts)
+
+
+def _lxml_node_to_obj(node):
+    """Convert an lxml plist element into the same objects plistlib returns."""
+    tag = node.tag
+    if tag == "dict":
+        children = list(node)
+        return {
+            (children[i].text or ""): _lxml_node_to_obj(children[i + 1])
+            for i in range(0, len(children), 2)
+        }
+    if tag == "array":
+        return [_lxml_node_to_obj(child) for child in node]
+    if tag == "string":
+        return node.text or ""
+    if tag == "integer":
+        text = node.text
+        # plistlib accepts hex literals here
+        if text.startswith("0x") or text.startswith("0X"):
+            return int(text, 16)
+        return int(text)
+    if tag == "real":
+        return float(node.text)
+    if tag == "true":
+        return True
+    if tag == "false":
+        return False
+    if tag == "data":
+        return base64.b64decode(node.text or "")
+    if tag == "date":
+        return _date_from_text(node.text)
+    raise ValueError(f"Unsupported plist element: <{tag}>")
+
+
+def _obj_to_lxml_node(value):
+    """Convert a Python value back into an lxml plist element."""
+    # bool must be checked before int (bool is an int subclass)
+    if isinstance(value, bool):
+        return _etree.Element("true" if value else "false")
+    if isinstance(value, dict):
+        el = _etree.Element("dict")
+        for k in sorted(value):
+            key_el = _etree.SubElement(el, "key")
+            key_el.text = k
+            el.append(_obj_to_lxml_node(value[k]))
+        return el
+    if isinstance(value, (list, tuple)):
+        el = _etree.Element("array")
+        for item in value:
+            el.append(_obj_to_lxml_node(item))
+        return el
+    if isinstance(value, str):
+        el = _etree.Element("string")
+        el.text = value
+        return el
+    if isinstance(value, int):
+        el = _etree.Element("integer")
+        el.text = str(value)
+        return el
+    if isinstance(value, float):
+        el = _etree.Element("real")
+        el.text = repr(value)
+        return el
+    if isinstance(value, (bytes, bytearray)):
+        el = _etree.Element("data")
+        el.text = base64.b64encode(bytes(value)).decode("ascii")
+        return el
+    if isinstance(value, datetime.datetime):
+        el = _etree.Element("date")
+        el.text = value.strftime(_PLIST_DATE_FMT)
+        return el
+    raise TypeError(f"Unsupported plist value type: {type(value)!r}")
+
+
+def lxml_plist_load(fp):
+    """Parse an XML plist via lxml, mirroring plistlib.load's output."""
+    # Strip comment nodes up front: they would otherwise appear as <dict>
+    # children and shift the key/value pairing
+    parser = _etree.XMLParser(remove_comments=True)
+    root = _etree.parse(fp, parser).getroot()
+    if root.tag != "plist" or len(root) == 0:
+        raise ValueError("Not a valid XML plist")
+    return _lxml_node_to_obj(root[0])
+
+
+def lxml_plist_dump(data, fp):
+    """Serialize data as an XML plist via lxml."""
+    root = _etree.Element("plist", version="1.0")
+    root.append(_obj_to_lxml_node(data))
+    fp.write(_etree.tostring(
+        root,
+        xml_declaration=True,
+        encoding="UTF-8",
+        pretty_print=True,
+        doctype=_PLIST_DOCTYPE,
+    ))
+
+
+def _fadvise_dontneed(fd: int) -> None:
+    """Tell the kernel the fd's cached pages won't be re-read (best-effort)."""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+
+def load_plist_with_fmt(path: str):
+    """Load a plist, detecting its format and hashing its bytes in one pass.
 
-def detect_plist_format(path: str) -> str:
-    """Return plistlib.FMT_BINARY or plistlib.FMT_XML based on file signature."""
+    Returns (data, fmt, digest, raw) where fmt is plistlib.FMT_BINARY or
+    plistlib.FMT_XML, decided from the file signature, digest is the SHA-256
+    of the on-disk bytes (used to elide no-op rewrites), and raw is the
+    original bytes, retained so writers can patch values in place (XML) or
+    hand the buffer to libplist (binary) instead of re-serializing.
+    """
+    with open(path, 'rb') as f:
+        try:
+            # Map the file read-only: signature sniff, hashing and parsing all
+            # run over the same kernel pages with no userspace copy.
+            src = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty file or mmap-hostile filesystem
+            src = io.BytesIO(f.read())
+        try:
+            fmt = plistlib.FMT_BINARY if src.read(8).startswith(b"bplist00") else plistlib.FMT_XML
+            digest = hashlib.sha256(
+                src if isinstance(src, mmap.mmap) else src.getvalue()
+            ).digest()
+            src.seek(0)
+            # Keep the raw bytes: writers patch values in place (XML) or hand
+            # the buffer to libplist (binary) instead of re-serializing from
+            # the dict
+            raw = src[:] if isinstance(src, mmap.mmap) else src.getvalue()
+            if fmt is plistlib.FMT_XML and _etree is not None:
+                return lxml_plist_load(src), fmt, digest, raw
+            return plistlib.load(src, fmt=fmt), fmt, digest, raw
+        finally:
+            src.close()
+            # One-shot CLI: the bytes are held in userspace now, so hint the
+            # kernel that the page-cache copy is not needed again
+            _fadvise_dontneed(f.fileno())
+
+
+# libplist (the C bplist library from libimobiledevice) handle, resolved
+# lazily on first binary-plist write. False means "looked and not usable".
+_libplist = None
+
+# plist_type enum value for PLIST_STRING in libplist's plist.h
+_PLIST_STRING = 3
+
+
+def _get_libplist():
+    """Resolve and configure libplist via ctypes; None when unavailable."""
+    global _libplist
+    if _libplist is None:
+        import ctypes
+        import ctypes.util
+
+        lib = None
+        name = ctypes.util.find_library("plist-2.0") or ctypes.util.find_library("plist")
+        if name:
+            try:
+                lib = ctypes.CDLL(name)
+                lib.plist_from_bin.argtypes = [ctypes.c_char_p, ctypes.c_uint32,
+                                               ctypes.POINTER(ctypes.c_void_p)]
+                lib.plist_to_bin.argtypes = [ctypes.c_void_p,
+                                             ctypes.POINTER(ctypes.c_void_p),
+                                             ctypes.POINTER(ctypes.c_uint32)]
+                lib.plist_dict_get_item.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+                lib.plist_dict_get_item.restype = ctypes.c_void_p
+                lib.plist_get_node_type.argtypes = [ctypes.c_void_p]
+                lib.plist_set_string_val.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+                lib.plist_free.argtypes = [ctypes.c_void_p]
+                if hasattr(lib, "plist_mem_free"):
+                    lib.plist_mem_free.argtypes = [ctypes.c_void_p]
+            except (OSError, AttributeError):
+                lib = None
+        _libplist = lib if lib is not None else False
+    return _libplist or None
+
+
+def _libplist_patch_bin(raw: bytes, key_path, replacements):
+    """Patch string values directly in libplist's C tree and re-export.
+
+    The binary analogue of _patch_xml_bytes: no Python dict is built and the
+    whole parse+serialize round-trip runs in C. Returns the new binary plist
+    bytes, or None when libplist is unavailable or the expected keys are
+    missing / not strings — callers then fall back to plistlib.
+    """
+    lib = _get_libplist()
+    if lib is None:
+        return None
+    import ctypes
+
+    root = ctypes.c_void_p()
+    lib.plist_from_bin(raw, len(raw), ctypes.byref(root))
+    if not root:
+        return None
     try:
-        with open(path, 'rb') as f:
-            header = f.read(8)
-        if header.startswith(b"bplist00"):
-            return plistlib.FMT_BINARY
-        return plistlib.FMT_XML
-    except FileNotFoundError:
+        target = root
+        for k in key_path:
+            target = ctypes.c_void_p(lib.plist_dict_get_item(target, k.encode("utf-8")))
+            if not target:
+                return None
+        for key, value in replacements:
+            item = ctypes.c_void_p(lib.plist_dict_get_item(target, key.encode("utf-8")))
+            if not item or lib.plist_get_node_type(item) != _PLIST_STRING:
+                return None
+            lib.plist_set_string_val(item, value.encode("utf-8"))
+        buf = ctypes.c_void_p()
+        length = ctypes.c_uint32()
+        lib.plist_to_bin(root, ctypes.byref(buf), ctypes.byref(length))
+        if not buf:
+            return None
+        try:
+            return ctypes.string_at(buf, length.value)
+        finally:
+            if hasattr(lib, "plist_mem_free"):
+                lib.plist_mem_free(buf)
+    finally:
+        lib.plist_free(root)
+
+
+def _patch_xml_bytes(raw: bytes, replacements):
+    """Patch <key>…</key><string>…</string> pairs directly in the original XML bytes.
+
+    O(bytes changed) instead of a full re-serialize, and it preserves the
+    document's original formatting exactly. Returns the patched bytes, or
+    None if any key does not appear exactly once (unusual plist shape) —
+    callers then fall back to a full serialize.
+
+    The match is by key name alone, with no nesting awareness: callers must
+    only supply keys they have confirmed exist at the intended path, so the
+    exactly-once requirement pins the occurrence to that path.
+    """
+    import re
+
+    for key, value in replacements:
+        pattern = re.compile(
+            rb"(<key>" + re.escape(key.encode("utf-8")) + rb"</key>\s*<string>)[^<]*(</string>)"
+        )
+        escaped = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        value_bytes = escaped.encode("utf-8")
+        raw, count = pattern.subn(lambda m: m.group(1) + value_bytes + m.group(2), raw)
+        if count != 1:
+            return None
+    return raw
+
+
+def serialize_plist(data, fmt) -> bytes:
+    """Serialize data to plist bytes in the given format."""
+    buf = io.BytesIO()
+    if fmt is plistlib.FMT_XML and _etree is not None:
+        lxml_plist_dump(data, buf)
+    else:
+        plistlib.dump(data, buf, fmt=fmt)
+    return buf.getvalue()
+
+
+# Whether the O_TMPFILE+linkat staging path works here; cleared on first
+# failure (non-Linux, unsupported filesystem, /proc unavailable).
+_o_tmpfile_usable = hasattr(os, "O_TMPFILE")
+
+
+def _stage_via_tmpfile(dname: str, target: str, payload: bytes, mode):
+    """Linux fast path: write an anonymous O_TMPFILE inode, then link it in.
+
+    The inode has no directory entry while being written, so an interrupted
+    stage leaks no .plist.tmp_* files and the directory is mutated only once
+    (at linkat time). Raises OSError where the filesystem or /proc does not
+    support this; callers fall back to mkstemp.
+    """
+    fd = os.open(dname, os.O_WRONLY | os.O_TMPFILE, 0o644)
+    try:
+        # os.write may return short; loop until every byte is down — a
+        # truncated stage must never survive to the rename
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+        if mode is not None:
+            os.fchmod(fd, mode)
+        base = os.path.basename(target)
+        for seq in range(100):
+            tmp_path = os.path.join(dname, f".plist.tmp_{os.getpid()}_{seq}_{base}")
+            try:
+                os.link(f"/proc/self/fd/{fd}", tmp_path, follow_symlinks=True)
+                return tmp_path
+            except FileExistsError:
+                continue
+        raise FileExistsError(f"Could not materialize tempfile for {target}")
+    finally:
+        os.close(fd)
+
+
+def _stage_via_mkstemp(dname: str, target: str, payload: bytes, mode):
+    """Portable staging path for macOS/BSD and filesystems without O_TMPFILE."""
+    import tempfile
+
+    fd, tmp_path = tempfile.mkstemp(prefix=".plist.tmp_", dir=dname)
+    try:
+        # Write through the fd mkstemp already opened — no close-and-reopen,
+        # and fchmod skips the VFS path walk os.chmod would repeat. 128KB
+        # buffer: large Manifest.plist payloads hit far fewer write()
+        # syscalls than the default 8KB block buffer would allow.
+        with os.fdopen(fd, 'wb', buffering=131072) as f:
+            f.write(payload)
+            f.flush()
+            if mode is not None:
+                os.fchmod(f.fileno(), mode)
+            os.fsync(f.fileno())
+    except BaseException:
+        discard_staged([tmp_path])
         raise
+    return tmp_path
 
 
-def load_plist(path: str):
-    with open(path, 'rb') as f:
-        return plistlib.load(f)
+def stage_plist(path: str, data, fmt, orig_digest=None, verify=True, raw=None, patch_keys=None, patch_path=()):
+    """Serialize data into a durable tempfile next to path; return its path.
 
+    The tempfile is fsynced so its contents are on disk before any rename
+    happens, and it carries the target's permission bits. If orig_digest
+    (SHA-256 of the file's current bytes) is given and the serialized output
+    hashes identically, nothing is staged and None is returned.
 
-def atomic_write_plist(path: str, data, fmt) -> None:
-    """Write plist atomically, preserving permissions when possible."""
+    When the original bytes (raw) and the changed (key, value) pairs
+    (patch_keys, nested under patch_path) are supplied, the output is
+    produced by patching rather than re-serializing from the dict: XML
+    plists get an in-place byte substitution, binary plists go through
+    libplist's C tree when that library is present. Any unusual shape
+    falls back to a full plistlib/lxml serialize.
+
+    With verify (the default), the staged file is read back and its SHA-256
+    compared against the in-memory payload before it is eligible for rename,
+    catching silent filesystem corruption and concurrent clobbering of the
+    tempfile. Raises RuntimeError on mismatch.
+    """
+    payload = None
+    if raw is not None and patch_keys:
+        if fmt is plistlib.FMT_XML:
+            payload = _patch_xml_bytes(raw, patch_keys)
+        else:
+            payload = _libplist_patch_bin(raw, patch_path, patch_keys)
+    if payload is None:
+        payload = serialize_plist(data, fmt)
+    payload_digest = hashlib.sha256(payload).digest()
+    if payload_digest == orig_digest:
+        return None
     dname = os.path.dirname(path) or "."
-    fd, tmp_path = tempfile.mkstemp(prefix=".plist.tmp_", dir=dname)
-    os.close(fd)
     try:
-        with open(tmp_path, 'wb') as f:
-            plistlib.dump(data, f, fmt=fmt)
-        # Preserve original mode if file exists
+        # fstat on a short-lived fd rather than os.stat: one path resolution
+        # that also pins the inode while its mode is read
+        src_fd = os.open(path, os.O_RDONLY)
         try:
-            st = os.stat(path)
-            os.chmod(tmp_path, st.st_mode)
-        except FileNotFoundError:
-            pass
-        os.replace(tmp_path, path)
-    finally:
-        # If replace failed for any reason, ensure tmp is removed
+            mode = os.fstat(src_fd).st_mode
+        finally:
+            os.close(src_fd)
+    except FileNotFoundError:
+        mode = None
+    global _o_tmpfile_usable
+    if _o_tmpfile_usable:
         try:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
+            tmp_path = _stage_via_tmpfile(dname, path, payload, mode)
+        except OSError:
+            _o_tmpfile_usable = False
+            tmp_path = _stage_via_mkstemp(dname, path, payload, mode)
+    else:
+        tmp_path = _stage_via_mkstemp(dname, path, payload, mode)
+    if verify:
+        with open(tmp_path, 'rb') as f:
+            on_disk_digest = hashlib.sha256(f.read()).digest()
+        if on_disk_digest != payload_digest:
+            discard_staged([tmp_path])
+            raise RuntimeError(f"Write verification failed for {path}: staged bytes do not match")
+    return tmp_path
+
+
+class DurabilityBarrier:
+    """Batches renames within one directory under a single fsync.
+
+    The directory fd is opened once on entry and reused for the barrier's
+    whole lifetime; each replace() publishes a staged tempfile, and a clean
+    exit fsyncs the directory exactly once — the metadata flush covers every
+    rename together, so a crash leaves either all old files or all new ones.
+    """
 
+    def __init__(self, dname: str):
+        self.dname = dname or "."
+        self.dfd = -1
+        self.targets = []
 
-def backup_file(path: str) -> str:
-    bak_path = path + ".bak"
-    if not os.path.exists(bak_path):
-        shutil.copy2(path, bak_path)
-    return bak_path
+    def __enter__(self):
+        self.dfd = os.open(self.dname, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+        return self
 
+    def replace(self, tmp_path: str, target: str) -> None:
+        os.replace(tmp_path, target)
+        self.targets.append(target)
 
-def set_key_if_changed(plist_data, key: str, value: str) -> bool:
-    """Set key to value; return True if changed."""
-    curr = plist_data.get(key)
-    if curr == value:
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and self.targets:
+                os.fsync(self.dfd)
+        finally:
+            os.close(self.dfd)
+            self.dfd = -1
+        if exc_type is None:
+            # Published files were already fsynced at stage time; drop their
+            # now-clean page-cache copies — this process won't re-read them
+            for target in self.targets:
+                try:
+                    tfd = os.open(target, os.O_RDONLY)
+                except OSError:
+                    continue
+                try:
+                    _fadvise_dontneed(tfd)
+                finally:
+                    os.close(tfd)
         return False
-    plist_data[key] = value
-    return True
 
 
-def ensure_path_dict(root, path_keys):
-    """Ensure nested dict exists for path_keys; return the dict at that path.
+def commit_staged(staged) -> None:
+    """Atomically publish staged tempfiles: (tmp_path, target_path) pairs.
+
+    Pairs are grouped by directory and published under one DurabilityBarrier
+    per directory, so each directory is fsynced once for all its renames.
+    """
+    by_dir = {}
+    for tmp_path, target in staged:
+        by_dir.setdefault(os.path.dirname(target) or ".", []).append((tmp_path, target))
+    for dname, pairs in by_dir.items():
+        with DurabilityBarrier(dname) as barrier:
+            for tmp_path, target in pairs:
+                barrier.replace(tmp_path, target)
+
+
+def discard_staged(tmp_paths) -> None:
+    """Unlink uncommitted tempfiles without a stat-then-remove race."""
+    for tmp_path in tmp_paths:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def backup_file(path: str) -> str:
+    """Create path + '.bak' preserving the pre-update bytes; return its path.
 
-    Raises ValueError if encountering a non-dict on the way.
+    Uses a hardlink where possible: since updates publish a fresh inode via
+    os.replace, the .bak link keeps pointing at the original data with zero
+    data-block I/O. Falls back to a full copy on filesystems without
+    hardlink support.
     """
-    node = root
-    for k in path_keys or []:
-        if k not in node:
-            node[k] = {}
-        if not isinstance(node[k], dict):
-            raise ValueError(f"Path '{'/'.join(path_keys)}' is not a dictionary; cannot write keys there")
-        node = node[k]
-    return node
-
-
-def update_plist(path: str, product_version: str, build_version: str, make_backup: bool = False, key_path=None, key_names=None) -> bool:
-    fmt = detect_plist_format(path)
-    data = load_plist(path)
-    target = ensure_path_dict(data, key_path or [])
+    bak_path = path + ".bak"
+    if not os.path.exists(bak_path):
+        try:
+            os.link(path, bak_path)
+        except OSError:
+            import shutil
+
+            shutil.copy2(path, bak_path)
+    return bak_path
+
+
+def _update_info(data, product_version: str, build_version: str) -> bool:
+    """Set top-level Info.plist version keys; return True if anything changed."""
+    prod_key, build_key = _INFO_KEYS
     changed = False
-    prod_key = (key_names or {}).get("product", "Product Version")
-    build_key = (key_names or {}).get("build", "Build Version")
-    changed |= set_key_if_changed(target, prod_key, product_version)
-    changed |= set_key_if_changed(target, build_key, build_version)
-    if not changed:
-        return False
-    if make_backup:
-        backup_file(path)
-    atomic_write_plist(path, data, fmt)
-    return True
+    if data.get(prod_key) != product_version:
+        data[prod_key] = product_version
+        changed = True
+    if data.get(build_key) != build_version:
+        data[build_key] = build_version
+        changed = True
+    return changed
+
+
+def _update_manifest(data, product_version: str, build_version: str) -> bool:
+    """Set Lockdown version keys in Manifest.plist; return True if anything changed."""
+    lockdown = data.get("Lockdown")
+    if lockdown is None:
+        lockdown = data["Lockdown"] = {}
+    elif not isinstance(lockdown, dict):
+        raise ValueError("'Lockdown' is not a dictionary; cannot write keys there")
+    prod_key, build_key = _MANIFEST_KEYS
+    changed = False
+    if lockdown.get(prod_key) != product_version:
+        lockdown[prod_key] = product_version
+        changed = True
+    if lockdown.get(build_key) != build_version:
+        lockdown[build_key] = build_version
+        changed = True
+    return changed
 
 
 def validate_bundle_path(bundle_path: str) -> None:
@@ -123,13 +573,56 @@ def validate_bundle_path(bundle_path: str) -> None:
         sys.exit(f"Error: Path is not a directory-like bundle: {bundle_path}")
 
 
+USAGE = """\
+Usage: update_backup_version.py BUNDLE [--version VER] [--build BUILD] [--backup] [--no-verify]
+
+Update Product/Build Version in backup bundle plists.
+
+Arguments:
+  BUNDLE         Path to backup bundle (e.g., *.mobiletransfer)
+  --version VER  Target Product Version (e.g., 17.0)
+  --build BUILD  Target Build Version (e.g., 21A123)
+  --backup       Create .bak files before writing
+  --no-verify    Skip read-back verification of written plists
+  -h, --help     Show this help and exit\
+"""
+
+
+def _option_value(arg, it, name):
+    value = arg.partition("=")[2] if "=" in arg else next(it, None)
+    if not value:
+        sys.exit(f"Error: {name} requires a value")
+    return value
+
+
 def parse_args(argv):
-    p = argparse.ArgumentParser(description="Update Product/Build Version in backup bundle plists")
-    p.add_argument("bundle", help="Path to backup bundle (e.g., *.mobiletransfer)")
-    p.add_argument("--version", dest="version", help="Target Product Version (e.g., 17.0)")
-    p.add_argument("--build", dest="build", help="Target Build Version (e.g., 21A123)")
-    p.add_argument("--backup", action="store_true", help="Create .bak files before writing")
-    return p.parse_args(argv)
+    # Four flags don't justify argparse: a hand parser avoids the import and
+    # parser construction entirely, cutting time to the first prompt.
+    import types
+
+    ns = types.SimpleNamespace(bundle=None, version=None, build=None, backup=False, no_verify=False)
+    it = iter(argv)
+    for arg in it:
+        if arg in ("-h", "--help"):
+            print(USAGE)
+            sys.exit(0)
+        elif arg == "--version" or arg.startswith("--version="):
+            ns.version = _option_value(arg, it, "--version")
+        elif arg == "--build" or arg.startswith("--build="):
+            ns.build = _option_value(arg, it, "--build")
+        elif arg == "--backup":
+            ns.backup = True
+        elif arg == "--no-verify":
+            ns.no_verify = True
+        elif arg.startswith("-"):
+            sys.exit(f"Unknown option: {arg}\n\n{USAGE}")
+        elif ns.bundle is None:
+            ns.bundle = arg
+        else:
+            sys.exit(f"Unexpected argument: {arg}\n\n{USAGE}")
+    if ns.bundle is None:
+        sys.exit(USAGE)
+    return ns
 
 
 def main(argv=None):
@@ -150,27 +643,32 @@ def main(argv=None):
         ])
         sys.exit(msg)
 
-    # Read and show current versions
-    def read_versions(path: str, key_path=None, allow_alias=False):
-        data = load_plist(path)
+    # Load each plist once; the same parsed data is reused for the update pass.
+    def read_versions(data, key_path=None, allow_alias=False):
         node = data
         for k in key_path or []:
             node = node.get(k, {}) if isinstance(node, dict) else {}
         pv = bv = None
         if isinstance(node, dict):
             # Prefer canonical names; optionally check aliases
-            pv = node.get("Product Version")
-            bv = node.get("Build Version")
+            pv = node.get(_INFO_KEYS[0])
+            bv = node.get(_INFO_KEYS[1])
             if allow_alias:
                 if pv is None:
-                    pv = node.get("ProductVersion")
+                    pv = node.get(_MANIFEST_KEYS[0])
                 if bv is None:
-                    bv = node.get("BuildVersion")
+                    bv = node.get(_MANIFEST_KEYS[1])
         return pv, bv
 
-    info_pv, info_bv = read_versions(info_path, None, allow_alias=True)
+    try:
+        info_data, info_fmt, info_digest, info_raw = load_plist_with_fmt(info_path)
+        man_data, man_fmt, man_digest, man_raw = load_plist_with_fmt(manifest_path)
+    except Exception as e:
+        sys.exit(f"Failed to read plists: {e}")
+
+    info_pv, info_bv = read_versions(info_data, None, allow_alias=True)
     # For Manifest, canonical keys typically have no spaces
-    man_pv, man_bv = read_versions(manifest_path, ["Lockdown"], allow_alias=True)
+    man_pv, man_bv = read_versions(man_data, ["Lockdown"], allow_alias=True)
 
     print("Current values:")
     print(f"- Info.plist: Product Version={info_pv!r}, Build Version={info_bv!r}")
@@ -204,29 +702,82 @@ def main(argv=None):
     if not build:
         sys.exit("Error: No Build Version provided. Use --build or interactive prompt.")
 
-    updated_any = False
-    for plist_path, label, key_path, key_names in (
-        (info_path, "Info.plist", None, {"product": "Product Version", "build": "Build Version"}),
-        (manifest_path, "Manifest.plist", ["Lockdown"], {"product": "ProductVersion", "build": "BuildVersion"}),
-    ):
-        try:
-            changed = update_plist(
-                plist_path,
-                version,
-                build,
-                make_backup=args.backup,
-                key_path=key_path,
-                key_names=key_names,
+    # Phase 1: stage every changed plist (write + fsync tempfiles), so either
+    # both files are published below or neither is. The two stages run on
+    # separate threads — serialization and the tempfile fsyncs overlap.
+    def stage_one(plist_path, data, fmt, digest, raw, update_fn, key_path, keys):
+        # The in-place patchers can only rewrite keys that already exist at
+        # key_path; check against the pre-update data, because update_fn may
+        # create missing keys (or the whole Lockdown dict) that only a full
+        # serialize can materialize. For XML this also guarantees the
+        # document's single <key> occurrence is the one at key_path.
+        node = data
+        for k in key_path:
+            node = node.get(k) if isinstance(node, dict) else None
+        patchable = isinstance(node, dict) and keys[0] in node and keys[1] in node
+        if not update_fn(data, version, build):
+            return None
+        tmp_path = stage_plist(
+            plist_path, data, fmt,
+            orig_digest=digest,
+            verify=not args.no_verify,
+            raw=raw if patchable else None,
+            patch_keys=((keys[0], version), (keys[1], build)),
+            patch_path=key_path,
+        )
+        if tmp_path is not None and args.backup:
+            try:
+                backup_file(plist_path)
+            except BaseException:
+                # main never learns about a tmp_path that isn't returned, so
+                # clean it up here or it outlives the run
+                discard_staged([tmp_path])
+                raise
+        return tmp_path
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [
+            (label, plist_path, pool.submit(stage_one, plist_path, data, fmt, digest, raw, update_fn, key_path, keys))
+            for plist_path, label, data, fmt, digest, raw, update_fn, key_path, keys in (
+                (info_path, "Info.plist", info_data, info_fmt, info_digest, info_raw,
+                 _update_info, (), _INFO_KEYS),
+                (manifest_path, "Manifest.plist", man_data, man_fmt, man_digest, man_raw,
+                 _update_manifest, ("Lockdown",), _MANIFEST_KEYS),
             )
-            if changed:
-                print(f"Updated {label}: Product Version -> {version}, Build Version -> {build}")
-                updated_any = True
-            else:
-                print(f"{label} already has target versions. No change.")
+        ]
+
+    # Gather in submission order so output stays deterministic; surface the
+    # first failure only after both stages have settled.
+    staged = []  # (tmp_path, target_path)
+    updated_labels = []
+    first_error = None
+    for label, plist_path, future in futures:
+        try:
+            tmp_path = future.result()
         except Exception as e:
-            sys.exit(f"Failed to update {label}: {e}")
-
-    if updated_any:
+            if first_error is None:
+                first_error = (label, e)
+            continue
+        if tmp_path is not None:
+            staged.append((tmp_path, plist_path))
+            updated_labels.append(label)
+        else:
+            print(f"{label} already has target versions. No change.")
+    if first_error is not None:
+        discard_staged(tmp for tmp, _target in staged)
+        label, e = first_error
+        sys.exit(f"Failed to update {label}: {e}")
+
+    # Phase 2: publish all renames under a single directory-fsync barrier —
+    # both plists live at the bundle root, so one dir fd covers the pair.
+    if staged:
+        try:
+            commit_staged(staged)
+        except Exception as e:
+            discard_staged(tmp for tmp, _target in staged)
+            sys.exit(f"Failed to commit updates: {e}")
+        for label in updated_labels:
+            print(f"Updated {label}: Product Version -> {version}, Build Version -> {build}")
         print("Done: Plists updated as requested.")
     else:
         print("No changes: Both plists already contained target versions.")